@@ -1,12 +1,17 @@
 import asyncio
+import hashlib
+import json
+import os
 import pathlib as pl
-from datetime import datetime, timezone
+import tempfile
+from datetime import UTC, datetime
 import dataclasses as dc
 from playwright.async_api import async_playwright, Browser, Page, Playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from .logger import logger
 
 
-@dc.dataclass(frozen=True)
+@dc.dataclass(frozen=True, slots=True)
 class DiscordMessage:
     id: str
     content: str
@@ -17,7 +22,7 @@ class DiscordMessage:
     attachments: list[str]
 
 
-@dc.dataclass(frozen=True)
+@dc.dataclass(frozen=True, slots=True)
 class DiscordChannel:
     id: str
     name: str
@@ -25,7 +30,7 @@ class DiscordChannel:
     guild_id: str | None
 
 
-@dc.dataclass(frozen=True)
+@dc.dataclass(frozen=True, slots=True)
 class DiscordGuild:
     id: str
     name: str
@@ -42,6 +47,7 @@ class ClientState:
     context: object | None = None  # BrowserContext
     page: Page | None = None
     logged_in: bool = False
+    storage_state_hash: str | None = None
     cookies_file: pl.Path = dc.field(
         default_factory=lambda: pl.Path.home() / ".discord_mcp_cookies.json"
     )
@@ -61,19 +67,90 @@ async def _ensure_browser(state: ClientState) -> ClientState:
     browser = await playwright.chromium.launch(headless=state.headless)
 
     ctx_kwargs = {}
+    storage_state_hash = None
     if state.cookies_file.exists():
         ctx_kwargs["storage_state"] = str(state.cookies_file)
+        storage_state_hash = await asyncio.to_thread(_hash_file, state.cookies_file)
     context = await browser.new_context(**ctx_kwargs)
     page = await context.new_page()
 
     return dc.replace(
-        state, playwright=playwright, browser=browser, context=context, page=page
+        state,
+        playwright=playwright,
+        browser=browser,
+        context=context,
+        page=page,
+        storage_state_hash=storage_state_hash,
     )
 
 
-async def _save_storage_state(state: ClientState) -> None:
-    if state.page:
-        await state.page.context.storage_state(path=str(state.cookies_file))
+async def open_client(state: ClientState) -> ClientState:
+    state = await _ensure_browser(state)
+    try:
+        return await _login(state)
+    except Exception:
+        await close_client(state)
+        raise
+
+
+async def open_page(state: ClientState) -> ClientState:
+    # A new tab in the same browser context shares its cookies and login
+    if not state.page:
+        raise RuntimeError("Browser page not initialized")
+    page = await state.page.context.new_page()
+    # Start inside the app rather than at about:blank so the first use of the
+    # tab takes _login's fast path instead of a full login check
+    try:
+        await page.goto(
+            "https://discord.com/channels/@me", wait_until="domcontentloaded"
+        )
+    except BaseException:
+        await page.close()
+        raise
+    return dc.replace(state, page=page)
+
+
+def is_client_alive(state: ClientState) -> bool:
+    return bool(
+        state.browser
+        and state.browser.is_connected()
+        and state.page
+        and not state.page.is_closed()
+    )
+
+
+def _hash_file(path: pl.Path) -> str:
+    return hashlib.sha1(path.read_bytes()).hexdigest()
+
+
+def _write_if_changed(path: pl.Path, content: str, previous_hash: str | None) -> str:
+    digest = hashlib.sha1(content.encode()).hexdigest()
+    if digest == previous_hash:
+        return digest
+
+    # Write to a sibling temp file and swap it in so readers never see a
+    # partially written cookies file
+    with tempfile.NamedTemporaryFile(
+        "w", dir=path.parent, prefix=f".{path.name}.", delete=False
+    ) as tmp:
+        try:
+            tmp.write(content)
+            tmp.close()
+            os.replace(tmp.name, path)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+    return digest
+
+
+async def _save_storage_state(state: ClientState) -> ClientState:
+    if not state.page:
+        return state
+    content = json.dumps(await state.page.context.storage_state())
+    digest = await asyncio.to_thread(
+        _write_if_changed, state.cookies_file, content, state.storage_state_hash
+    )
+    return dc.replace(state, storage_state_hash=digest)
 
 
 async def _check_logged_in(state: ClientState) -> bool:
@@ -83,9 +160,14 @@ async def _check_logged_in(state: ClientState) -> bool:
         await state.page.goto(
             "https://discord.com/channels/@me", wait_until="domcontentloaded"
         )
-        await state.page.wait_for_selector(
-            '[data-list-id="guildsnav"] [role="treeitem"]',
-            state="visible",
+        # Resolve on whichever comes first: the guild list rendering or a
+        # redirect to the login/register pages
+        await state.page.wait_for_function(
+            """() => {
+                const path = location.pathname;
+                if (path.startsWith('/login') || path.startsWith('/register')) return true;
+                return !!document.querySelector('[data-list-id="guildsnav"] [role="treeitem"]');
+            }""",
             timeout=15000,
         )
 
@@ -105,8 +187,14 @@ async def _check_logged_in(state: ClientState) -> bool:
         return False
 
 
+def _is_still_logged_in_fast(page: Page) -> bool:
+    # Discord redirects to /login when the session expires, so staying on
+    # /channels/ means the session is still good without another navigation
+    return page.url.startswith("https://discord.com/channels/")
+
+
 async def _login(state: ClientState) -> ClientState:
-    if state.logged_in:
+    if state.logged_in and state.page and _is_still_logged_in_fast(state.page):
         return state
 
     state = await _ensure_browser(state)
@@ -138,16 +226,12 @@ async def _login(state: ClientState) -> ClientState:
             )
 
         if await _check_logged_in(state):
-            was_logged_in = state.logged_in
             state = dc.replace(state, logged_in=True)
             await asyncio.sleep(5)
-            if state.page:
-                await state.page.goto("https://discord.com/channels/@me")
-            await asyncio.sleep(3)
 
-            if not was_logged_in:
-                await _save_storage_state(state)
-            return state
+            # A form login always brings fresh cookies, even when the state was
+            # marked logged in before its session expired
+            return await _save_storage_state(state)
         else:
             raise RuntimeError("Login appeared to succeed but verification failed")
     except Exception as e:
@@ -170,11 +254,6 @@ async def close_client(state: ClientState) -> None:
         except Exception:
             pass
 
-    # Force garbage collection to help cleanup
-    import gc
-
-    gc.collect()
-
 
 async def get_guilds(state: ClientState) -> tuple[ClientState, list[DiscordGuild]]:
     state = await _login(state)
@@ -185,7 +264,7 @@ async def get_guilds(state: ClientState) -> tuple[ClientState, list[DiscordGuild
     await state.page.goto(
         "https://discord.com/channels/@me", wait_until="domcontentloaded"
     )
-    logger.debug(f"Navigated to Discord, current URL: {state.page.url}")
+    logger.debug("Navigated to Discord, current URL: %s", state.page.url)
 
     # Wait for Discord to fully load guilds with text content
     try:
@@ -223,14 +302,20 @@ async def get_guilds(state: ClientState) -> tuple[ClientState, list[DiscordGuild
     # Extract guild information from navigation elements
     guilds_data = await state.page.evaluate("""
         () => {
+            const GUILD_ID_RE = /^[0-9]+$/;
+            const DIGITS_RE = /^\\d+$/;
+            const MENTION_RE = /^\\d+\\s+mentions?,\\s*/;
+            const WS_RE = /\\s+/g;
+
             const guilds = [];
+            const seenIds = new Set();
             const treeItems = document.querySelectorAll('[data-list-id="guildsnav"] [role="treeitem"]');
             
             treeItems.forEach(item => {
                 const listItemId = item.getAttribute('data-list-item-id');
                 if (listItemId?.startsWith('guildsnav___') && listItemId !== 'guildsnav___home') {
                     const guildId = listItemId.replace('guildsnav___', '');
-                    if (/^[0-9]+$/.test(guildId)) {
+                    if (GUILD_ID_RE.test(guildId)) {
                         // Extract guild name from tree item text
                         let guildName = null;
                         const textElements = item.querySelectorAll('*');
@@ -238,7 +323,7 @@ async def get_guilds(state: ClientState) -> tuple[ClientState, list[DiscordGuild
                             const text = elem.textContent?.trim();
                             if (text && text.length > 2 && text.length < 100 && 
                                 !text.includes('notification') && !text.includes('unread') &&
-                                !text.match(/^\\d+$/)) {
+                                !DIGITS_RE.test(text)) {
                                 guildName = text;
                                 break;
                             }
@@ -247,16 +332,17 @@ async def get_guilds(state: ClientState) -> tuple[ClientState, list[DiscordGuild
                         if (!guildName) {
                             const fullText = item.textContent?.trim();
                             if (fullText) {
-                                guildName = fullText.replace(/^\\d+\\s+mentions?,\\s*/, '').replace(/\\s+/g, ' ').trim();
+                                guildName = fullText.replace(MENTION_RE, '').replace(WS_RE, ' ').trim();
                             }
                         }
                         
                         // Clean up mention prefixes
                         if (guildName) {
-                            guildName = guildName.replace(/^\\d+\\s+mentions?,\\s*/, '').trim();
+                            guildName = guildName.replace(MENTION_RE, '').trim();
                         }
                         
-                        if (guildName && !guilds.some(g => g.id === guildId)) {
+                        if (guildName && !seenIds.has(guildId)) {
+                            seenIds.add(guildId);
                             guilds.push({ id: guildId, name: guildName });
                         }
                     }
@@ -288,48 +374,55 @@ async def get_guild_channels(
     )
     await state.page.wait_for_timeout(3000)
 
-    # Helper function to extract channels
-    def extract_channels_js() -> str:
-        return f"""
-            (() => {{
-                const channels = [];
-                const seenIds = new Set();
-                const links = document.querySelectorAll('a[href*="/channels/"]');
-                
-                links.forEach(link => {{
-                    const match = link.href.match(/\\/channels\\/{guild_id}\\/([0-9]+)/);
-                    if (match) {{
-                        const channelId = match[1];
-                        if (!seenIds.has(channelId)) {{
-                            seenIds.add(channelId);
-                            let name = link.textContent?.trim() || '';
-                            name = name.replace(/^[^a-zA-Z0-9#-_]+/, '').trim();
-                            name = name.replace(/\\s+/g, ' ').trim();
-                            channels.push({{
-                                id: channelId,
-                                name: name || `channel-${{channelId}}`,
-                                href: link.href
-                            }});
-                        }}
-                    }}
-                }});
-                return channels;
-            }})()
-        """
+    # Extract channel links for the guild passed in as the argument
+    extract_channels_js = """
+        guildId => {
+            const CHAN_RE = new RegExp(`/channels/${guildId}/([0-9]+)`);
+            const LEAD_RE = /^[^a-zA-Z0-9#-_]+/;
+            const WS_RE = /\\s+/g;
+
+            const channels = [];
+            const seenIds = new Set();
+            const links = document.querySelectorAll('a[href*="/channels/"]');
+            
+            links.forEach(link => {
+                const match = link.href.match(CHAN_RE);
+                if (match) {
+                    const channelId = match[1];
+                    if (!seenIds.has(channelId)) {
+                        seenIds.add(channelId);
+                        let name = link.textContent?.trim() || '';
+                        name = name.replace(LEAD_RE, '').trim();
+                        name = name.replace(WS_RE, ' ').trim();
+                        channels.push({
+                            id: channelId,
+                            name: name || `channel-${channelId}`,
+                            href: link.href
+                        });
+                    }
+                }
+            });
+            return channels;
+        }
+    """
 
     # Step 1: Get original channels
     logger.debug("Getting original channels")
-    original_channels = await state.page.evaluate(extract_channels_js())
-    logger.debug(f"Found {len(original_channels)} original channels")
+    original_channels = await state.page.evaluate(extract_channels_js, guild_id)
+    logger.debug("Found %d original channels", len(original_channels))
 
     # Step 2: Click Browse Channels and get additional channels
     browse_channels = []
     try:
-        browse_element = await state.page.query_selector(
-            '*:has-text("Browse Channels")'
-        )
-        if browse_element and await browse_element.is_visible():
-            await browse_element.click()
+        # Find and click the first visible match in-page (one round-trip)
+        clicked = await state.page.locator('text="Browse Channels"').evaluate_all("""
+            els => {
+                const el = els.find(e => e.offsetParent !== null);
+                if (el) el.click();
+                return !!el;
+            }
+        """)
+        if clicked:
             await state.page.wait_for_timeout(5000)
             logger.debug("Clicked Browse Channels")
 
@@ -341,10 +434,10 @@ async def get_guild_channels(
             """)
             await state.page.wait_for_timeout(3000)
 
-            browse_channels = await state.page.evaluate(extract_channels_js())
-            logger.debug(f"Found {len(browse_channels)} browse channels")
+            browse_channels = await state.page.evaluate(extract_channels_js, guild_id)
+            logger.debug("Found %d browse channels", len(browse_channels))
     except Exception as e:
-        logger.debug(f"Browse Channels failed: {e}")
+        logger.debug("Browse Channels failed: %s", e)
 
     # Step 3: Combine channels (original first, then new browse channels)
     all_channels = {}
@@ -360,7 +453,7 @@ async def get_guild_channels(
         if ch["id"] not in all_channels:
             final_channels.append(ch)
 
-    logger.debug(f"Total unique channels: {len(final_channels)}")
+    logger.debug("Total unique channels: %d", len(final_channels))
 
     channels = [
         DiscordChannel(id=ch["id"], name=ch["name"], type=0, guild_id=guild_id)
@@ -370,64 +463,6 @@ async def get_guild_channels(
     return state, channels
 
 
-async def _extract_message_data(
-    element, channel_id: str, collected: int
-) -> DiscordMessage | None:
-    try:
-        message_id = (
-            await element.get_attribute("id") or f"message-{collected}"
-        ).replace("chat-messages-", "")
-
-        content = ""
-        for selector in [
-            '[class*="messageContent"]',
-            '[class*="markup"]',
-            ".messageContent",
-        ]:
-            content_elem = await element.query_selector(selector)
-            if content_elem and (text := await content_elem.text_content()):
-                content = text.strip()
-                break
-
-        author_name = "Unknown"
-        for selector in ['[class*="username"]', '[class*="authorName"]', ".username"]:
-            author_elem = await element.query_selector(selector)
-            if author_elem and (name := await author_elem.text_content()):
-                author_name = name.strip()
-                break
-
-        timestamp_elem = await element.query_selector("time")
-        timestamp_str = (
-            await timestamp_elem.get_attribute("datetime") if timestamp_elem else None
-        )
-        timestamp = (
-            datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
-            if timestamp_str
-            else datetime.now(timezone.utc)
-        )
-
-        attachments = [
-            href
-            for att in await element.query_selector_all('a[href*="cdn.discordapp.com"]')
-            if (href := await att.get_attribute("href"))
-        ]
-
-        if not content and not attachments:
-            return None
-
-        return DiscordMessage(
-            id=message_id,
-            content=content,
-            author_name=author_name,
-            author_id="unknown",
-            channel_id=channel_id,
-            timestamp=timestamp,
-            attachments=attachments,
-        )
-    except Exception:
-        return None
-
-
 async def get_channel_messages(
     state: ClientState,
     server_id: str,
@@ -447,48 +482,126 @@ async def get_channel_messages(
     await state.page.wait_for_selector('[data-list-id="chat-messages"]', timeout=15000)
 
     # Scroll to bottom for newest messages
-    await state.page.evaluate("""
+    await state.page.evaluate("""() => {
         const chat = document.querySelector('[data-list-id="chat-messages"]');
-        if (chat) chat.scrollTo(0, chat.scrollHeight);
-        window.scrollTo(0, document.body.scrollHeight);
-    """)
+        if (!chat) return;
+        // Same lookup as the collector below: the list itself doesn't scroll
+        let scroller = chat.parentElement;
+        while (scroller && scroller.scrollHeight <= scroller.clientHeight) {
+            scroller = scroller.parentElement;
+        }
+        if (scroller) scroller.scrollTop = scroller.scrollHeight;
+    }""")
     await state.page.wait_for_timeout(2000)
 
-    messages = []
-    seen_ids = set()
+    # Scroll up and collect messages in-page, newest first, until we have
+    # enough or no new messages load for 2s
+    messages_data = await state.page.evaluate(
+        """
+        ({ limit, before, after }) => new Promise(resolve => {
+            const chat = document.querySelector('[data-list-id="chat-messages"]');
+            if (!chat) return resolve([]);
+            // The list itself carries a scrollerInner class, so find the
+            // element that actually scrolls instead of matching class names
+            let scroller = chat.parentElement;
+            while (scroller && scroller.scrollHeight <= scroller.clientHeight) {
+                scroller = scroller.parentElement;
+            }
+            scroller = scroller || chat.parentElement;
+
+            const pickText = (el, selectors) => {
+                for (const selector of selectors) {
+                    const text = el.querySelector(selector)?.textContent?.trim();
+                    if (text) return text;
+                }
+                return null;
+            };
+
+            const messages = [];
+            const seenIds = new Set();
+            const collect = () => {
+                const elements = chat.querySelectorAll('[id^="chat-messages-"]');
+                for (let i = elements.length - 1; i >= 0 && messages.length < limit; i--) {
+                    const el = elements[i];
+                    const id = el.id.replace('chat-messages-', '');
+                    if (seenIds.has(id)) continue;
+                    if ((before && id >= before) || (after && id <= after)) {
+                        seenIds.add(id);
+                        continue;
+                    }
+
+                    const content = pickText(el, ['[class*="messageContent"]', '[class*="markup"]', '.messageContent']) || '';
+                    const attachments = Array.from(
+                        el.querySelectorAll('a[href*="cdn.discordapp.com"]'),
+                        a => a.getAttribute('href')
+                    ).filter(Boolean);
+                    // Possibly not rendered yet: leave it unseen so a later
+                    // pass can pick it up
+                    if (!content && !attachments.length) continue;
+                    seenIds.add(id);
+
+                    messages.push({
+                        id,
+                        content,
+                        author_name: pickText(el, ['[class*="username"]', '[class*="authorName"]', '.username']) || 'Unknown',
+                        timestamp: el.querySelector('time')?.getAttribute('datetime') || null,
+                        attachments,
+                    });
+                }
+            };
+
+            let done = false;
+            let idleTimer;
+            const finish = () => {
+                if (done) return;
+                done = true;
+                observer.disconnect();
+                clearTimeout(idleTimer);
+                clearTimeout(deadline);
+                resolve(messages);
+            };
+            const step = () => {
+                const seenBefore = seenIds.size;
+                collect();
+                if (messages.length >= limit) return finish();
+                if (seenIds.size > seenBefore) {
+                    clearTimeout(idleTimer);
+                    idleTimer = setTimeout(finish, 2000);
+                }
+                scroller.scrollTop = 0;
+            };
+
+            const observer = new MutationObserver(step);
+            observer.observe(chat, { childList: true });
+            const deadline = setTimeout(finish, 30000);
+            idleTimer = setTimeout(finish, 2000);
+            step();
+        })
+        """,
+        {"limit": limit, "before": before, "after": after},
+    )
 
-    for attempt in range(10):
-        elements = await state.page.query_selector_all(
-            '[data-list-id="chat-messages"] [id^="chat-messages-"]'
+    # Messages without a <time> element fall back to a single shared "now"
+    now = datetime.now(UTC)
+    messages = [
+        DiscordMessage(
+            id=data["id"],
+            content=data["content"],
+            author_name=data["author_name"],
+            author_id="unknown",
+            channel_id=channel_id,
+            timestamp=(
+                datetime.fromisoformat(data["timestamp"]) if data["timestamp"] else now
+            ),
+            attachments=data["attachments"],
         )
-        if not elements:
-            await state.page.keyboard.press("PageUp")
-            await state.page.wait_for_timeout(1000)
-            continue
-
-        for element in reversed(elements):
-            if len(messages) >= limit:
-                break
-            try:
-                message = await _extract_message_data(
-                    element, channel_id, len(seen_ids)
-                )
-                if message and message.id not in seen_ids:
-                    if before and message.id >= before:
-                        continue
-                    if after and message.id <= after:
-                        continue
-                    seen_ids.add(message.id)
-                    messages.append(message)
-            except Exception:
-                continue
-
-        if len(messages) >= limit or not elements:
-            break
-        await state.page.keyboard.press("PageUp")
-        await state.page.wait_for_timeout(1000)
-
-    return state, sorted(messages, key=lambda m: m.timestamp, reverse=True)[:limit]
+        for data in messages_data
+    ]
+
+    # DOM order isn't guaranteed across observer passes (unread dividers,
+    # lazy-loaded chunks), and callers rely on newest first
+    messages.sort(key=lambda m: m.timestamp, reverse=True)
+    return state, messages
 
 
 async def send_message(
@@ -509,7 +622,26 @@ async def send_message(
         raise RuntimeError("Could not find message input")
 
     await message_input.fill(content)
-    await state.page.keyboard.press("Enter")
-    await asyncio.sleep(1)
 
-    return state, f"sent-{int(datetime.now().timestamp())}"
+    # Discord clears the editor before the POST completes, and the page goes
+    # back to the pool afterwards, so wait for the response itself
+    try:
+        async with state.page.expect_response(
+            lambda r: (
+                r.request.method == "POST"
+                and f"/channels/{channel_id}/messages" in r.url
+            ),
+            timeout=10000,
+        ) as response_info:
+            await state.page.keyboard.press("Enter")
+    except PlaywrightTimeoutError as e:
+        raise RuntimeError("Discord did not confirm the message was sent") from e
+
+    response = await response_info.value
+    if not response.ok:
+        # Slowmode, missing permissions and rate limits all end up here
+        detail = (await response.text())[:200]
+        raise RuntimeError(
+            f"Discord rejected the message (HTTP {response.status}): {detail}"
+        )
+    return state, (await response.json())["id"]
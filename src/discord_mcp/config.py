@@ -11,6 +11,10 @@ class DiscordConfig(tp.NamedTuple):
     default_guild_ids: list[str]
     max_messages_per_channel: int
     default_hours_back: int
+    max_concurrent_tools: int = 4
+    prefetch_channels: bool = False
+    guilds_ttl: float = 300.0
+    channels_ttl: float = 60.0
 
 
 def load_config() -> DiscordConfig:
@@ -33,6 +37,12 @@ def load_config() -> DiscordConfig:
 
     max_messages = int(os.getenv("MAX_MESSAGES_PER_CHANNEL", "200"))
     hours_back = int(os.getenv("DEFAULT_HOURS_BACK", "24"))
+    max_concurrent_tools = int(os.getenv("MAX_CONCURRENT_TOOLS", "4"))
+    if max_concurrent_tools < 1:
+        raise ValueError("MAX_CONCURRENT_TOOLS must be at least 1")
+    prefetch_channels = os.getenv("PREFETCH_CHANNELS", "false").lower() == "true"
+    guilds_ttl = float(os.getenv("GUILDS_CACHE_TTL", "300"))
+    channels_ttl = float(os.getenv("CHANNELS_CACHE_TTL", "60"))
 
     return DiscordConfig(
         email=email,
@@ -41,4 +51,8 @@ def load_config() -> DiscordConfig:
         default_guild_ids=guild_ids,
         max_messages_per_channel=max_messages,
         default_hours_back=hours_back,
+        max_concurrent_tools=max_concurrent_tools,
+        prefetch_channels=prefetch_channels,
+        guilds_ttl=guilds_ttl,
+        channels_ttl=channels_ttl,
     )
@@ -1,10 +1,13 @@
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 
 def setup_logger(
-    name: str = "discord_mcp", level: int = logging.DEBUG
+    name: str = "discord_mcp", level: int = logging.INFO
 ) -> logging.Logger:
     logger = logging.getLogger(name)
     logger.setLevel(level)
@@ -16,16 +19,25 @@ def setup_logger(
         "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s"
     )
 
-    console_handler = logging.StreamHandler(sys.stdout)
+    # stdout carries the MCP stdio transport, so log to stderr
+    console_handler = logging.StreamHandler(sys.stderr)
     console_handler.setLevel(level)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
 
     log_file = Path("discord_mcp_debug.log")
     file_handler = logging.FileHandler(log_file)
     file_handler.setLevel(level)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+
+    # Hand records to a background thread so the event loop never blocks on
+    # console or disk writes
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(-1)
+    listener = QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(QueueHandler(log_queue))
 
     return logger
 
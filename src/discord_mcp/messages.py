@@ -11,10 +11,14 @@ async def read_recent_messages(
     max_messages: int = 1000,
 ) -> tuple[ClientState, list[DiscordMessage]]:
     logger.debug(
-        f"read_recent_messages called for server {server_id}, channel {channel_id}, {hours_back}h back, max {max_messages}"
+        "read_recent_messages called for server %s, channel %s, %sh back, max %s",
+        server_id,
+        channel_id,
+        hours_back,
+        max_messages,
     )
     cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours_back)
-    logger.debug(f"Cutoff time set to: {cutoff_time}")
+    logger.debug("Cutoff time set to: %s", cutoff_time)
 
     # Get messages in chronological order (newest first)
     state, all_messages = await get_channel_messages(
@@ -23,15 +27,18 @@ async def read_recent_messages(
         channel_id=channel_id,
         limit=max_messages,
     )
-    logger.debug(f"Retrieved {len(all_messages)} total messages")
+    logger.debug("Retrieved %d total messages", len(all_messages))
 
-    # Filter to only recent messages within the time window
+    # Filter to only recent messages within the time window. A full scan
+    # rather than stopping at the first old message, so one out-of-place
+    # message can't hide newer ones behind it
     recent_messages = [m for m in all_messages if m.timestamp > cutoff_time]
     logger.debug(
-        f"Filtered to {len(recent_messages)} messages after cutoff {cutoff_time}"
+        "Filtered to %d messages after cutoff %s", len(recent_messages), cutoff_time
     )
 
     logger.debug(
-        f"read_recent_messages completed, returning {len(recent_messages)} messages in chronological order (newest first)"
+        "read_recent_messages completed, returning %d messages in chronological order (newest first)",
+        len(recent_messages),
     )
     return state, recent_messages
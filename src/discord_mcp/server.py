@@ -1,26 +1,69 @@
 import asyncio
+import time
 import typing as tp
 from contextlib import asynccontextmanager
-from collections.abc import AsyncIterator, Callable
-from dataclasses import dataclass
+from collections.abc import AsyncIterator, Callable, Coroutine
+from dataclasses import dataclass, field
 
 from mcp.server.fastmcp import FastMCP
+from pydantic import Field
 from .logger import logger
 from .client import (
+    ClientState,
+    DiscordChannel,
+    DiscordGuild,
+    DiscordMessage,
     create_client_state,
     get_guilds,
     get_guild_channels,
     send_message as send_discord_message,
     close_client,
+    is_client_alive,
+    open_client,
+    open_page,
 )
 from .config import load_config
 from .messages import read_recent_messages
 
 
-@dataclass
+@dataclass(slots=True)
 class DiscordContext:
     config: tp.Any
     client_lock: asyncio.Lock
+    client_state: ClientState | None = None
+    page_pool: asyncio.Queue[ClientState] = field(default_factory=asyncio.Queue)
+    # Pages of the current browser borrowed from the pool by operations
+    pages_out: int = 0
+    closing_clients: set[asyncio.Task[None]] = field(default_factory=set)
+    guilds_cache: tuple[float, list[DiscordGuild]] | None = None
+    channels_cache: dict[str, tuple[float, list[DiscordChannel]]] = field(
+        default_factory=dict
+    )
+    # Serialize refreshes per cache entry so concurrent misses share one fetch.
+    # Channel locks are striped by server ID so caller-supplied IDs can't grow
+    # an unbounded lock table
+    guilds_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    channels_locks: tuple[asyncio.Lock, ...] = field(
+        default_factory=lambda: tuple(asyncio.Lock() for _ in range(16))
+    )
+    prefetch_tasks: dict[str, asyncio.Task[list[DiscordChannel]]] = field(
+        default_factory=dict
+    )
+    # Prefetches hold at most this many pages, leaving the rest to tool calls
+    prefetch_slots: asyncio.Semaphore = field(
+        default_factory=lambda: asyncio.Semaphore(1)
+    )
+
+
+# Discord rejects messages longer than this
+_MAX_MESSAGE_LENGTH = 2000
+
+# Prefetches run one at a time at roughly 11s per guild, so with the default
+# 60s channel TTL later entries would expire before the queue drained
+_PREFETCH_GUILD_LIMIT = 5
+
+# How long to wait for a free page before checking the pool for lost slots
+_PAGE_WAIT = 5.0
 
 
 @asynccontextmanager
@@ -28,97 +71,359 @@ async def discord_lifespan(server: FastMCP) -> AsyncIterator[DiscordContext]:
     config = load_config()
     client_lock = asyncio.Lock()
     logger.debug("Discord MCP server starting up")
+    discord_ctx = DiscordContext(config=config, client_lock=client_lock)
     try:
-        yield DiscordContext(config=config, client_lock=client_lock)
+        yield discord_ctx
     finally:
         logger.debug("Discord MCP server shutting down")
+        prefetches = list(discord_ctx.prefetch_tasks.values())
+        for task in prefetches:
+            task.cancel()
+        await asyncio.gather(*prefetches, return_exceptions=True)
+        if discord_ctx.client_state:
+            await close_client(discord_ctx.client_state)
+        await asyncio.gather(*discord_ctx.closing_clients)
 
 
-async def _execute_with_fresh_client[T](
-    discord_ctx: DiscordContext,
-    operation: Callable[[tp.Any], tp.Awaitable[tuple[tp.Any, T]]],
-) -> T:
-    """Execute Discord operation with fresh client state"""
+async def _ensure_client(discord_ctx: DiscordContext) -> ClientState:
+    """Launch the shared browser and fill the page pool, relaunching if the browser died"""
     async with discord_ctx.client_lock:
-        client_state = create_client_state(
-            discord_ctx.config.email, discord_ctx.config.password, True
+        client_state = discord_ctx.client_state
+        if client_state is not None and is_client_alive(client_state):
+            # Replace pages lost to failed or cancelled replacements
+            pool = discord_ctx.page_pool
+            missing = (
+                discord_ctx.config.max_concurrent_tools
+                - pool.qsize()
+                - discord_ctx.pages_out
+            )
+            for _ in range(missing):
+                pool.put_nowait(await open_page(client_state))
+            return client_state
+
+        if client_state is not None:
+            # Tear the dead browser down in the background while the new one
+            # launches, keeping a reference so the task isn't collected early
+            logger.debug("Browser is gone, relaunching client")
+            task = asyncio.create_task(close_client(client_state))
+            discord_ctx.closing_clients.add(task)
+            task.add_done_callback(discord_ctx.closing_clients.discard)
+        client_state = await open_client(
+            create_client_state(
+                discord_ctx.config.email, discord_ctx.config.password, True
+            )
         )
+        discord_ctx.client_state = client_state
+
+        # Pages from the old browser are dropped, and any still borrowed are
+        # discarded when they come back
+        while not discord_ctx.page_pool.empty():
+            discord_ctx.page_pool.get_nowait()
+        discord_ctx.pages_out = 0
+        # One tab per concurrent tool call: the pool doubles as the semaphore
+        for _ in range(discord_ctx.config.max_concurrent_tools):
+            discord_ctx.page_pool.put_nowait(await open_page(client_state))
+        return client_state
+
+
+async def _release_page(discord_ctx: DiscordContext, state: ClientState) -> None:
+    """Return a page to the pool, replacing it if it broke during the operation"""
+    client_state = discord_ctx.client_state
+    if client_state is None or state.browser is not client_state.browser:
+        # Belongs to a browser that has already been replaced, even if the
+        # page itself is still open
+        return
+
+    discord_ctx.pages_out -= 1
+    if is_client_alive(state):
+        discord_ctx.page_pool.put_nowait(state)
+        return
+    # Tops the pool back up, relaunching first if the whole browser died
+    try:
+        await _ensure_client(discord_ctx)
+    except Exception as e:
+        # Don't mask the operation's own outcome; the next _ensure_client
+        # call restores the slot
+        logger.debug("Could not replace broken page: %s", e)
+
+
+def _fresh[T](entry: tuple[float, T] | None, max_age: float) -> T | None:
+    """Cached value if it was stored less than max_age seconds ago"""
+    if entry is not None and time.monotonic() - entry[0] < max_age:
+        return entry[1]
+    return None
+
+
+async def _execute_with_client[T, *Ts](
+    discord_ctx: DiscordContext,
+    operation: Callable[[ClientState, *Ts], tp.Awaitable[tuple[ClientState, T]]],
+    *args: *Ts,
+) -> T:
+    """Execute Discord operation on a pooled page of the shared browser"""
+    while True:
+        await _ensure_client(discord_ctx)
         try:
-            _, result = await operation(client_state)
-            return result
-        finally:
-            logger.debug("Cleaning up browser resources")
-            await close_client(client_state)
+            state = await asyncio.wait_for(discord_ctx.page_pool.get(), _PAGE_WAIT)
+            break
+        except TimeoutError:
+            # Every page may still be busy, or a replacement may have failed;
+            # _ensure_client restores any slot that was lost
+            continue
+    discord_ctx.pages_out += 1
+    try:
+        state, result = await operation(state, *args)
+        return result
+    finally:
+        await _release_page(discord_ctx, state)
+
+
+async def _parallel[T](
+    coros: dict[str, Coroutine[tp.Any, tp.Any, T]], max_parallel: int = 4
+) -> dict[str, T | Exception]:
+    """Run keyed coroutines concurrently with at most max_parallel in flight.
+
+    A failing coroutine maps to its exception instead of failing its siblings.
+    """
+    semaphore = asyncio.Semaphore(max_parallel)
+
+    async def run(key: str, coro: Coroutine[tp.Any, tp.Any, T]) -> T:
+        async with semaphore:
+            try:
+                return await coro
+            except Exception as e:
+                logger.debug("Batch item %s failed: %s", key, e)
+                raise
+
+    results = await asyncio.gather(
+        *(run(key, coro) for key, coro in coros.items()), return_exceptions=True
+    )
+    outcomes: dict[str, T | Exception] = {}
+    for key, result in zip(coros, results):
+        if isinstance(result, BaseException) and not isinstance(result, Exception):
+            raise result
+        outcomes[key] = result
+    return outcomes
 
 
 mcp = FastMCP("discord-mcp", lifespan=discord_lifespan)
 
 
-@mcp.tool()
-async def get_servers() -> list[dict[str, str]]:
-    """List all Discord servers (guilds) you have access to"""
-    ctx = mcp.get_context()
-    discord_ctx = tp.cast(DiscordContext, ctx.request_context.lifespan_context)
+def _ctx() -> DiscordContext:
+    """Lifespan context of the tool call in progress"""
+    return tp.cast(DiscordContext, mcp.get_context().request_context.lifespan_context)
 
-    guilds = await _execute_with_fresh_client(discord_ctx, get_guilds)
+
+@mcp.tool()
+async def get_servers(refresh: bool = False) -> list[dict[str, str]]:
+    """List all Discord servers (guilds) you have access to. Set refresh to bypass the short-lived cache"""
+    discord_ctx = _ctx()
+
+    requested = time.monotonic()
+    guilds = (
+        None
+        if refresh
+        else _fresh(discord_ctx.guilds_cache, discord_ctx.config.guilds_ttl)
+    )
+    if guilds is None:
+        async with discord_ctx.guilds_lock:
+            # Reuse a fetch that finished while this call waited for the lock
+            guilds = _fresh(discord_ctx.guilds_cache, time.monotonic() - requested)
+            if guilds is None:
+                guilds = await _execute_with_client(discord_ctx, get_guilds)
+                discord_ctx.guilds_cache = (time.monotonic(), guilds)
+                # With a single page, any prefetch would stall tool calls
+                if (
+                    discord_ctx.config.prefetch_channels
+                    and discord_ctx.config.max_concurrent_tools > 1
+                ):
+                    _prefetch_channels(discord_ctx, guilds)
     return [{"id": g.id, "name": g.name} for g in guilds]
 
 
+async def _fetch_channels(
+    discord_ctx: DiscordContext, server_id: str
+) -> list[DiscordChannel]:
+    requested = time.monotonic()
+    locks = discord_ctx.channels_locks
+    async with locks[hash(server_id) % len(locks)]:
+        # Reuse a fetch (or prefetch) that finished while this call waited
+        channels = _fresh(
+            discord_ctx.channels_cache.get(server_id), time.monotonic() - requested
+        )
+        if channels is None:
+            channels = await _execute_with_client(
+                discord_ctx, get_guild_channels, server_id
+            )
+            discord_ctx.channels_cache[server_id] = (time.monotonic(), channels)
+        return channels
+
+
+async def _guild_channels(
+    discord_ctx: DiscordContext, server_id: str, refresh: bool
+) -> list[DiscordChannel]:
+    if not refresh:
+        channels = _fresh(
+            discord_ctx.channels_cache.get(server_id), discord_ctx.config.channels_ttl
+        )
+        if channels is not None:
+            return channels
+    return await _fetch_channels(discord_ctx, server_id)
+
+
+def _prefetch_channels(discord_ctx: DiscordContext, guilds: list[DiscordGuild]) -> None:
+    """Start fetching channels of the first few uncached guilds in the background"""
+    tasks = discord_ctx.prefetch_tasks
+    ttl = discord_ctx.config.channels_ttl
+
+    async def prefetch(server_id: str) -> list[DiscordChannel]:
+        async with discord_ctx.prefetch_slots:
+            # A tool call may have cached it while this task was queued
+            channels = _fresh(discord_ctx.channels_cache.get(server_id), ttl)
+            if channels is not None:
+                return channels
+            return await _fetch_channels(discord_ctx, server_id)
+
+    def done(server_id: str, task: asyncio.Task[list[DiscordChannel]]) -> None:
+        tasks.pop(server_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(
+                "Channel prefetch for %s failed: %s", server_id, task.exception()
+            )
+
+    uncached = [
+        g
+        for g in guilds
+        if g.id not in tasks
+        and _fresh(discord_ctx.channels_cache.get(g.id), ttl) is None
+    ]
+    for g in uncached[:_PREFETCH_GUILD_LIMIT]:
+        task = asyncio.create_task(prefetch(g.id))
+        tasks[g.id] = task
+        task.add_done_callback(lambda t, server_id=g.id: done(server_id, t))
+
+
+def _channel_dict(c: DiscordChannel) -> dict[str, str]:
+    return {"id": c.id, "name": c.name, "type": str(c.type)}
+
+
 @mcp.tool()
-async def get_channels(server_id: str) -> list[dict[str, str]]:
-    """List all channels in a specific Discord server"""
-    ctx = mcp.get_context()
-    discord_ctx = tp.cast(DiscordContext, ctx.request_context.lifespan_context)
+async def get_channels(server_id: str, refresh: bool = False) -> list[dict[str, str]]:
+    """List all channels in a specific Discord server. Set refresh to bypass the short-lived cache"""
+    discord_ctx = _ctx()
 
-    async def operation(state):
-        return await get_guild_channels(state, server_id)
+    channels = await _guild_channels(discord_ctx, server_id, refresh)
+    return [_channel_dict(c) for c in channels]
 
-    channels = await _execute_with_fresh_client(discord_ctx, operation)
-    return [{"id": c.id, "name": c.name, "type": str(c.type)} for c in channels]
+
+@mcp.tool()
+async def get_channels_batch(
+    server_ids: tp.Annotated[list[str], Field(min_length=1)], refresh: bool = False
+) -> dict[str, list[dict[str, str]] | dict[str, str]]:
+    """List the channels of several Discord servers at once, keyed by server ID. A server that fails maps to {"error": message}"""
+    discord_ctx = _ctx()
+
+    results = await _parallel(
+        {
+            sid: _guild_channels(discord_ctx, sid, refresh)
+            for sid in dict.fromkeys(server_ids)
+        },
+        discord_ctx.config.max_concurrent_tools,
+    )
+    return {
+        sid: (
+            {"error": str(channels)}
+            if isinstance(channels, Exception)
+            else [_channel_dict(c) for c in channels]
+        )
+        for sid, channels in results.items()
+    }
+
+
+async def _read_channel(
+    discord_ctx: DiscordContext,
+    server_id: str,
+    channel_id: str,
+    hours_back: int,
+    max_messages: int,
+) -> list[DiscordMessage]:
+    return await _execute_with_client(
+        discord_ctx,
+        read_recent_messages,
+        server_id,
+        channel_id,
+        hours_back,
+        max_messages,
+    )
+
+
+def _message_dict(m: DiscordMessage) -> dict[str, tp.Any]:
+    return {
+        "id": m.id,
+        "content": m.content,
+        "author_name": m.author_name,
+        # FastMCP encodes results with pydantic_core, which writes
+        # datetimes as ISO 8601 natively
+        "timestamp": m.timestamp,
+        "attachments": m.attachments,
+    }
 
 
 @mcp.tool()
 async def read_messages(
-    server_id: str, channel_id: str, max_messages: int, hours_back: int = 24
+    server_id: str,
+    channel_id: str,
+    max_messages: tp.Annotated[int, Field(ge=1, le=1000)],
+    hours_back: tp.Annotated[
+        int, Field(ge=1, le=8760, description="At most 1 year")
+    ] = 24,
 ) -> list[dict[str, tp.Any]]:
     """Read recent messages from a specific channel"""
-    if not (1 <= hours_back <= 8760):
-        raise ValueError("hours_back must be between 1 and 8760 (1 year)")
-    if not (1 <= max_messages <= 1000):
-        raise ValueError("max_messages must be between 1 and 1000")
+    discord_ctx = _ctx()
 
-    ctx = mcp.get_context()
-    discord_ctx = tp.cast(DiscordContext, ctx.request_context.lifespan_context)
+    messages = await _read_channel(
+        discord_ctx, server_id, channel_id, hours_back, max_messages
+    )
+    return [_message_dict(m) for m in messages]
 
-    async def operation(state):
-        return await read_recent_messages(
-            state, server_id, channel_id, hours_back, max_messages
-        )
 
-    messages = await _execute_with_fresh_client(discord_ctx, operation)
-    return [
+@mcp.tool()
+async def read_messages_batch(
+    server_id: str,
+    channel_ids: tp.Annotated[list[str], Field(min_length=1)],
+    max_messages: tp.Annotated[int, Field(ge=1, le=1000)],
+    hours_back: tp.Annotated[
+        int, Field(ge=1, le=8760, description="At most 1 year")
+    ] = 24,
+) -> dict[str, list[dict[str, tp.Any]] | dict[str, str]]:
+    """Read recent messages from several channels of a server at once, keyed by channel ID. A channel that fails maps to {"error": message}"""
+    discord_ctx = _ctx()
+
+    results = await _parallel(
         {
-            "id": m.id,
-            "content": m.content,
-            "author_name": m.author_name,
-            "timestamp": m.timestamp.isoformat(),
-            "attachments": m.attachments,
-        }
-        for m in messages
-    ]
+            cid: _read_channel(discord_ctx, server_id, cid, hours_back, max_messages)
+            for cid in dict.fromkeys(channel_ids)
+        },
+        discord_ctx.config.max_concurrent_tools,
+    )
+    return {
+        cid: (
+            {"error": str(messages)}
+            if isinstance(messages, Exception)
+            else [_message_dict(m) for m in messages]
+        )
+        for cid, messages in results.items()
+    }
 
 
 @mcp.tool()
 async def send_message(
-    server_id: str, channel_id: str, content: str
+    server_id: str, channel_id: str, content: tp.Annotated[str, Field(min_length=1)]
 ) -> dict[str, tp.Any]:
     """Send a message to a specific Discord channel. Long messages are automatically split."""
-    if len(content) == 0:
-        raise ValueError("Message content cannot be empty")
-
-    # Split long messages into chunks of 2000 characters or less
+    # Split long messages into chunks Discord will accept
+    content_length = len(content)
     chunks = []
-    if len(content) <= 2000:
+    if content_length <= _MAX_MESSAGE_LENGTH:
         chunks = [content]
     else:
         # Split by newlines first to avoid breaking paragraphs
@@ -127,15 +432,18 @@ async def send_message(
 
         for line in lines:
             # If single line is too long, split it by words
-            if len(line) > 2000:
+            if len(line) > _MAX_MESSAGE_LENGTH:
                 words = line.split(" ")
                 current_line = ""
                 for word in words:
-                    if len(current_line + " " + word) <= 2000:
+                    if len(current_line + " " + word) <= _MAX_MESSAGE_LENGTH:
                         current_line += (" " + word) if current_line else word
                     else:
                         if current_line:
-                            if len(current_chunk + "\n" + current_line) <= 2000:
+                            if (
+                                len(current_chunk + "\n" + current_line)
+                                <= _MAX_MESSAGE_LENGTH
+                            ):
                                 current_chunk += (
                                     ("\n" + current_line)
                                     if current_chunk
@@ -147,9 +455,9 @@ async def send_message(
                             current_line = word
                         else:
                             # Single word too long, truncate it
-                            current_line = word[:2000]
+                            current_line = word[:_MAX_MESSAGE_LENGTH]
                 if current_line:
-                    if len(current_chunk + "\n" + current_line) <= 2000:
+                    if len(current_chunk + "\n" + current_line) <= _MAX_MESSAGE_LENGTH:
                         current_chunk += (
                             ("\n" + current_line) if current_chunk else current_line
                         )
@@ -158,7 +466,7 @@ async def send_message(
                         current_chunk = current_line
             else:
                 # Normal line length
-                if len(current_chunk + "\n" + line) <= 2000:
+                if len(current_chunk + "\n" + line) <= _MAX_MESSAGE_LENGTH:
                     current_chunk += ("\n" + line) if current_chunk else line
                 else:
                     chunks.append(current_chunk)
@@ -167,18 +475,13 @@ async def send_message(
         if current_chunk:
             chunks.append(current_chunk)
 
-    ctx = mcp.get_context()
-    discord_ctx = tp.cast(DiscordContext, ctx.request_context.lifespan_context)
+    discord_ctx = _ctx()
 
     message_ids = []
     for i, chunk in enumerate(chunks):
-
-        async def operation(state, chunk_content=chunk):
-            return await send_discord_message(
-                state, server_id, channel_id, chunk_content
-            )
-
-        message_id = await _execute_with_fresh_client(discord_ctx, operation)
+        message_id = await _execute_with_client(
+            discord_ctx, send_discord_message, server_id, channel_id, chunk
+        )
         message_ids.append(message_id)
 
         # Small delay between messages to avoid rate limiting
@@ -189,11 +492,18 @@ async def send_message(
         "message_ids": message_ids,
         "status": "sent",
         "chunks": len(chunks),
-        "total_length": len(content),
+        "total_length": content_length,
     }
 
 
 def main():
+    # uvloop cuts per-await overhead; it isn't available on Windows
+    try:
+        import uvloop
+    except ImportError:
+        pass
+    else:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     mcp.run()
 
 
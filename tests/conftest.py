@@ -3,7 +3,8 @@ import pytest_asyncio
 import asyncio
 import os
 from dotenv import load_dotenv
-from src.discord_mcp.client import create_client_state, close_client
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
 from src.discord_mcp.config import DiscordConfig
 
 load_dotenv()
@@ -17,7 +18,7 @@ def event_loop():
     loop.close()
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def real_config():
     """Provide real Discord configuration from environment."""
     email = os.getenv("DISCORD_EMAIL")
@@ -38,19 +39,41 @@ def real_config():
     )
 
 
-@pytest_asyncio.fixture
-async def discord_client(real_config):
-    """Provide a real Discord client for integration testing."""
-    client_state = create_client_state(
-        email=real_config.email,
-        password=real_config.password,
-        headless=real_config.headless,
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def mcp_session(real_config):
+    """Provide one MCP server session shared by a test module, so the browser launches once."""
+    server_params = StdioServerParameters(
+        command="uv",
+        args=["run", "python", "main.py"],
+        env={
+            "DISCORD_EMAIL": real_config.email,
+            "DISCORD_PASSWORD": real_config.password,
+            "DISCORD_HEADLESS": "true",
+        },
     )
+    ready: asyncio.Future[ClientSession] = asyncio.get_running_loop().create_future()
+    stop = asyncio.Event()
 
-    yield client_state
+    # stdio_client's task group must be entered and exited in the same task,
+    # so keep the session open in a task of its own rather than across the
+    # fixture's setup and teardown
+    async def serve():
+        try:
+            async with stdio_client(server_params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    ready.set_result(session)
+                    await stop.wait()
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e)
+            raise
 
-    # Cleanup
-    await close_client(client_state)
+    task = asyncio.create_task(serve())
+    yield await ready
+
+    stop.set()
+    await task
 
 
 @pytest.fixture(autouse=True)